@@ -1,6 +1,17 @@
+import sys
 import ply.lex  as ply_lexer
 import ply.yacc as ply_parser
 
+# Select the code generation backend:
+#   rpn -> expressions packed as RPN strings (EVAL x[i] x[j] >)
+#   tac -> three-address instructions over registers (--tac flag)
+backend = 'tac' if '--tac' in sys.argv[1:] else 'rpn'
+
+# Enable the loop optimizations (-O flag):
+#   INC/DEC for i = i + 1 and i = i - 1 in both backends
+#   loop-invariant code motion in the tac backend
+optimize = '-O' in sys.argv[1:]
+
 # Create the scanner machine (lexer) to tokenize
 # the given input program file (Test_program.txt)
 with open('src/Test_program.txt', 'r') as source_file:
@@ -171,6 +182,8 @@ print('--------------Parser stage----------------')
 
 label_count = 0
 start_label_count = 0
+register_count = 0
+physical_registers = 8
 assembly_code = []
 
 import re
@@ -199,6 +212,228 @@ def replace_labels_with_numbers(instructions):
         new_instructions.append(instruction)
     return new_instructions
 
+# --- Three-address code (tac backend) helpers ---
+#
+# In the tac backend an expression is passed up the parse tree as a pair
+# (instructions, operand): the instructions that compute it and the
+# operand (variable, constant or virtual register $tN) holding the result.
+# An id is passed up as (instructions, name, indexes) so it can be used
+# either as a value (LOAD) or as an assignment target (STORE).
+
+tac_operators = {
+    '+' : 'ADD',
+    '-' : 'SUB',
+    '*' : 'MUL',
+    '/' : 'DIV',
+    '<' : 'LT',
+    '>' : 'GT',
+    '<=': 'LE',
+    '>=': 'GE',
+    '==': 'EQ',
+    '|' : 'OR',
+    '&' : 'AND',
+    '!' : 'NOT',
+}
+
+def new_register():
+    global register_count
+    register_count += 1
+    return f'$t{register_count}'
+
+def tac(operation, *operands):
+    return f'    {operation:<4} ' + ', '.join(str(operand) for operand in operands)
+
+def tac_operation(operation, *values):
+    # Combine the instructions of each operand and compute the result into a new register
+    instructions = []
+    operands = []
+    for value_instructions, operand in values:
+        instructions += value_instructions
+        operands.append(operand)
+
+    register = new_register()
+    return instructions + [tac(tac_operators[operation], register, *operands)], register
+
+def tac_load(id_value):
+    # Read an id as a value, loading every index of x[i][j]...
+    instructions, operand, indexes = id_value
+    for index in indexes:
+        register = new_register()
+        instructions = instructions + [tac('LOAD', register, operand, index)]
+        operand = register
+    return instructions, operand
+
+def tac_store(id_value, value):
+    # Assign a value to an id, storing into the last index of x[i][j]...
+    instructions, name, indexes = id_value
+    value_instructions, operand = value
+
+    if not indexes:
+        if re.fullmatch(r'\$t\d+', str(operand)) and value_instructions:
+            # Write the result straight into the variable: ADD i, i, 1
+            destination = re.sub(r'\$t\d+', name, value_instructions[-1], count=1)
+            return instructions + value_instructions[:-1] + [destination]
+        return instructions + value_instructions + [tac('MOV', name, operand)]
+
+    base_instructions, base = tac_load((instructions, name, indexes[:-1]))
+    return base_instructions + value_instructions + [tac('STORE', base, indexes[-1], operand)]
+
+def allocate_registers(instructions):
+    # Map the virtual registers $tN onto $r0..$rN using linear-scan allocation.
+    # Registers that do not fit are spilled to memory slots $sN.
+    intervals = {}
+    for index, instruction in enumerate(instructions):
+        for register in re.findall(r'\$t\d+', instruction):
+            start, _ = intervals.get(register, (index, index))
+            intervals[register] = (start, index)
+
+    # A register defined before a loop and used inside of it
+    # must stay alive until the jump back to the loop start
+    for loop_start, loop_end in find_loops(instructions):
+        for register, (start, end) in intervals.items():
+            if start < loop_start <= end < loop_end:
+                intervals[register] = (start, loop_end)
+
+    free_registers = [f'$r{number}' for number in range(physical_registers)]
+    active = []
+    allocation = {}
+    spill_count = 0
+
+    for register, (start, end) in sorted(intervals.items(), key=lambda item: item[1][0]):
+        # Release the registers whose interval ended
+        for interval in sorted(active):
+            if interval[0] > start:
+                break
+            active.remove(interval)
+            free_registers.append(allocation[interval[1]])
+        free_registers.sort(key=lambda name: int(name[2:]))
+
+        if free_registers:
+            allocation[register] = free_registers.pop(0)
+            active.append((end, register))
+            continue
+
+        # Spill whichever interval lives the longest
+        furthest = max(active)
+        if furthest[0] > end:
+            allocation[register] = allocation[furthest[1]]
+            allocation[furthest[1]] = f'$s{spill_count}'
+            active.remove(furthest)
+            active.append((end, register))
+        else:
+            allocation[register] = f'$s{spill_count}'
+        spill_count += 1
+
+    return [re.sub(r'\$t\d+', lambda match: allocation[match.group()], instruction) for instruction in instructions]
+
+# --- Loop optimizations (-O flag) ---
+
+def find_loops(instructions):
+    # A while loop is a label followed later on by a GOTO back to it.
+    # Loops are returned as (label index, jump index), inner loops first.
+    labels = {}
+    loops = []
+    for index, instruction in enumerate(instructions):
+        label = re.match(r'(L\d+):', instruction)
+        if label:
+            labels[label.group(1)] = index
+        jump = re.match(r'\s+GOTO\s+(L\d+)', instruction)
+        if jump and jump.group(1) in labels:
+            loops.append((labels[jump.group(1)], index))
+    return loops
+
+def split_tac(instruction):
+    # '    ADD  $t1, i, 1' -> ('ADD', ['$t1', 'i', '1'])
+    match = re.match(r'\s+(\w+)\s+(.*)', instruction)
+    if match is None:
+        return None, []
+    return match.group(1), match.group(2).split(', ')
+
+def hoist_loop_invariants(instructions):
+    # Move the computations of a while condition whose operands do not change
+    # inside of the loop in front of its label, so they are evaluated once
+    # instead of every iteration. Only the condition is taken: it runs on every
+    # entry to the loop, while the body may not run at all.
+    for loop_number in range(len(find_loops(instructions))):
+        loop_start, loop_end = find_loops(instructions)[loop_number]
+        body = instructions[loop_start + 1:loop_end]
+
+        # Array each register was loaded from: for m[i][j] the STORE base
+        # is the row register of m[i], and m is what gets written
+        arrays = {}
+        for instruction in instructions:
+            operation, operands = split_tac(instruction)
+            if operation == 'LOAD':
+                arrays[operands[0]] = arrays.get(operands[1], operands[1])
+
+        # Variables, arrays and registers written inside of the loop
+        assigned = set()
+        for instruction in body:
+            operation, operands = split_tac(instruction)
+            if operation == 'STORE':
+                assigned.add(arrays.get(operands[0], operands[0]))
+            elif operation not in (None, 'GOTO', 'GOTOF', 'PRINT'):
+                assigned.add(operands[0])
+
+        hoisted = []
+        remaining = []
+        invariant = set()
+        in_condition = True
+        for instruction in body:
+            operation, operands = split_tac(instruction)
+
+            hoist = in_condition and (
+                operation in tac_operators.values() or operation == 'LOAD'
+            ) and re.fullmatch(r'\$t\d+', operands[0]) is not None
+            hoist = hoist and all(
+                operand not in assigned or operand in invariant for operand in operands[1:]
+            )
+
+            if hoist:
+                hoisted.append(instruction)
+                invariant.add(operands[0])
+            else:
+                remaining.append(instruction)
+
+            if operation == 'GOTOF':
+                in_condition = False
+
+        instructions = (
+            instructions[:loop_start] + hoisted + [instructions[loop_start]] +
+            remaining + instructions[loop_end:]
+        )
+    return instructions
+
+def reduce_increments(instructions):
+    # Replace i = i + 1 and i = i - 1 with the dedicated INC i and DEC i
+    reduced = []
+    for instruction in instructions:
+        # tac backend: ADD i, i, 1
+        match = re.fullmatch(r'\s+(ADD|SUB)\s+(\w+), (\S+), (\S+)', instruction)
+        if match:
+            operation, target, left, right = match.groups()
+            operator = '+' if operation == 'ADD' else '-'
+
+        # rpn backend: EVAL 1 i + / ASS i (right operand pushed first)
+        if match is None:
+            match = re.fullmatch(r'\s+EVAL (\S+) (\S+) ([+-])\n\s+ASS\s+(\w+)', instruction)
+            if match:
+                right, left, operator, target = match.groups()
+
+        step = None
+        if match and left == target and right in ('1', '-1'):
+            step = int(right) if operator == '+' else -int(right)
+        elif match and operator == '+' and right == target and left in ('1', '-1'):
+            step = int(left)
+
+        if step == 1:
+            reduced.append(tac('INC', target))
+        elif step == -1:
+            reduced.append(tac('DEC', target))
+        else:
+            reduced.append(instruction)
+    return reduced
+
 precedence = (
     ('nonassoc', 'MIN', 'MAJ', 'MIN_EQ', 'MAJ_EQ'),  # Nonassociative operators
     ('left', 'PLUS', 'MINUS'),
@@ -213,7 +448,15 @@ def p_prog(p):
     for instruction in p[1]:
         assembly_code.append(instruction)
 
-    for instruction in replace_labels_with_numbers(p[2]):
+    statements = replace_labels_with_numbers(p[2])
+    if optimize:
+        statements = reduce_increments(statements)
+    if optimize and backend == 'tac':
+        statements = hoist_loop_invariants(statements)
+    if backend == 'tac':
+        statements = allocate_registers(statements)
+
+    for instruction in statements:
         assembly_code.append(instruction)
     assembly_code[-1] += ' END'
     pass
@@ -270,10 +513,16 @@ def p_if_stmt(p):
     '''
     global label_count
 
-    if_instruction = [
-        f'    EVAL {p[3]}',
-        f'    GOTOF LABEL{label_count + 1}'
-    ]
+    if backend == 'tac':
+        condition_instructions, condition = p[3]
+        if_instruction = condition_instructions + [
+            tac('GOTOF', condition, f'LABEL{label_count + 1}')
+        ]
+    else:
+        if_instruction = [
+            f'    EVAL {p[3]}',
+            f'    GOTOF LABEL{label_count + 1}'
+        ]
 
     statement = p[5]
     if_jump_instruction   = []
@@ -316,10 +565,16 @@ def p_while_stmt(p):
     '''
     global label_count
 
-    while_instruction = [
-        f'LABEL{label_count}: EVAL {p[3]}',
-        f'    GOTOF LABEL{label_count + 1}',
-    ]
+    if backend == 'tac':
+        condition_instructions, condition = p[3]
+        while_instruction = [f'LABEL{label_count}:'] + condition_instructions + [
+            tac('GOTOF', condition, f'LABEL{label_count + 1}'),
+        ]
+    else:
+        while_instruction = [
+            f'LABEL{label_count}: EVAL {p[3]}',
+            f'    GOTOF LABEL{label_count + 1}',
+        ]
 
     statement = p[5] # list of instructions
     
@@ -336,7 +591,11 @@ def p_while_stmt(p):
 def p_print_stmt(p):
     '''print_stmt : PRINT exp S
     '''
-    p[0] = [f'    PRINT {p[2]}']
+    if backend == 'tac':
+        instructions, operand = p[2]
+        p[0] = instructions + [tac('PRINT', operand)]
+    else:
+        p[0] = [f'    PRINT {p[2]}']
     pass
 
 def p_block_stmt(p):
@@ -347,7 +606,10 @@ def p_block_stmt(p):
 
 def p_assignment(p):
     '''assignment : id EQ exp S'''
-    p[0] = [f'    EVAL {p[3]}\n    ASS  {p[1]}']
+    if backend == 'tac':
+        p[0] = tac_store(p[1], p[3])
+    else:
+        p[0] = [f'    EVAL {p[3]}\n    ASS  {p[1]}']
     pass
 
 def p_type(p):
@@ -398,7 +660,18 @@ def p_id_array(p):
         | SO id SC id_array
         | empty
     '''
-    if len(p) == 5:
+    if len(p) == 5 and backend == 'tac':
+        # Non-empty id_array as (instructions, indexes)
+        if isinstance(p[2], tuple):
+            instructions, index = tac_load(p[2])
+        else:
+            instructions, index = [], p[2]
+
+        if p[4] is None:
+            p[0] = (instructions, [index])
+        else:
+            p[0] = (instructions + p[4][0], [index] + p[4][1])
+    elif len(p) == 5:
         # Non-empty id_array
         if p[4] is None:
             p[0] = f'[{p[2]}]'
@@ -413,7 +686,12 @@ def p_id(p):
     '''id : ID
         | ID id_array
     '''
-    if p[2] is not None:
+    if backend == 'tac':
+        if p[2] is not None:
+            p[0] = (p[2][0], p[1], p[2][1])
+        else:
+            p[0] = ([], p[1], [])
+    elif p[2] is not None:
         p[0] = f'{p[1]}{p[2]}'
     else:
         p[0] = f'{p[1]}'
@@ -442,7 +720,14 @@ def p_condition(p):
         | exp MAJ_EQ exp
         | exp MIN_EQ exp
     '''
-    if len(p) == 3:
+    if backend == 'tac':
+        if len(p) == 3:
+            p[0] = tac_operation(p[1], p[2])
+        elif len(p) == 4:
+            p[0] = tac_operation(p[2], p[1], p[3])
+        elif len(p) == 5:
+            p[0] = tac_operation('==', p[1], p[4])
+    elif len(p) == 3:
         p[0] = f'{p[2]} {p[1]}'
     elif len(p) == 4: 
         p[0] = f'{p[3]} {p[1]} {p[2]}'
@@ -456,7 +741,10 @@ def p_arigmethic(p):
         | exp STAR exp
         | exp DIV exp
     '''
-    p[0] = f'{p[3]} {p[1]} {p[2]}'
+    if backend == 'tac':
+        p[0] = tac_operation(p[2], p[1], p[3])
+    else:
+        p[0] = f'{p[3]} {p[1]} {p[2]}'
     pass
 
 def p_number_id(p):
@@ -464,7 +752,10 @@ def p_number_id(p):
         | INT
         | DOUBLE
     '''
-    p[0] = f'{p[1]}'
+    if backend == 'tac':
+        p[0] = tac_load(p[1]) if isinstance(p[1], tuple) else ([], p[1])
+    else:
+        p[0] = f'{p[1]}'
     pass
 
 def p_unumber_id(p):
@@ -472,10 +763,17 @@ def p_unumber_id(p):
         | exp UMINUS
         | MINUS exp %prec UMINUS
     '''
-    if len(p) == 2:
+    if backend == 'tac':
+        if len(p) == 2:
+            p[0] = ([], p[1])
+        elif p[1] == '-':
+            p[0] = tac_operation('-', ([], 0), p[2])
+        else:
+            p[0] = tac_operation('+', p[1], ([], p[2]))
+    elif len(p) == 2:
         p[0] = f'{p[1]}'
     elif p[1] == '-':
-        p[0] = f'0 {p[2]} -'
+        p[0] = f'{p[2]} 0 -'
     else:
         p[0] = f'{p[1]} {p[2]} +'
     pass
@@ -510,7 +808,15 @@ print('--------------Pseudo-assembly code----------------')
 for code in assembly_code:
     print(code)
 
-output_path = 'src/output_instructions.txt'
+# The -O output is saved apart, so it does not replace the plain one
+if backend == 'tac' and optimize:
+    output_path = 'src/output_optimized_tac_instructions.txt'
+elif backend == 'tac':
+    output_path = 'src/output_tac_instructions.txt'
+elif optimize:
+    output_path = 'src/output_optimized_instructions.txt'
+else:
+    output_path = 'src/output_instructions.txt'
 
 # Open the file in write mode ('w')
 with open(output_path, 'w') as file:
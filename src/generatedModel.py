@@ -43,7 +43,7 @@ tokens = [
 t_ignore = ' \t\r'  # Ignore space, tab, and carriage return
 
 def t_COMMENT(t):
-    r'//[^\\n]*'
+    r'//[^\n]*'
     pass  # Ignore comments
 
 def t_WHITESPACE(t):
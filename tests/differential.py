@@ -0,0 +1,730 @@
+import io
+import os
+import re
+import sys
+import time
+import random
+import runpy
+import argparse
+import tempfile
+from contextlib import redirect_stdout, redirect_stderr
+
+# Differential harness for the lexers and the code generation backends.
+#
+# Every case is a program of the custom language, either one of the test
+# programs or a random program from the grammar fuzzer below. For each case:
+#   - src/generatedModel.py and src/Lexical-Asignacion.py must scan the
+#     same token stream (after normalizing UMINUS and numeric values)
+#   - on random token sequences with the literals the lexers scan
+#     differently (1.5e3, 007, -0, 3.), each lexer must produce the tokens
+#     expected for it; those differences are reported as expected lexer
+#     divergences, any other one fails
+#   - the rpn backend with -O must match the plain rpn output except for
+#     the i = i + 1 / i = i - 1 assignments turned into INC / DEC
+#   - every backend must print and leave in memory the same values when
+#     executed: tac as rpn, and each -O backend as its plain version
+#   - an optimized backend must not execute more instructions than its
+#     plain version (slow path regression)
+#
+# The execution time of every backend is also measured per case. The
+# slowest cases are listed, and the cases where an optimized backend runs
+# slower than its plain version beyond --tolerance (and by at least a
+# millisecond) are flagged. Timings are too noisy to fail a run, so only
+# the instruction count does.
+#
+# Usage (from the repository root):
+#   python tests/differential.py --cases 200 --seed 1
+#
+# When hypothesis is installed the random programs are drawn through it,
+# seeded with --seed, and only the shrunk failing programs are reported;
+# otherwise a seeded random generator is used.
+
+try:
+    from hypothesis import given, seed, settings, strategies as st
+    if sys.version_info < (3, 11):
+        # Backport hypothesis groups its distinct failures with
+        from exceptiongroup import BaseExceptionGroup
+except ImportError:
+    given = None
+
+root_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+parser_script = os.path.join(root_path, 'src', 'Lexical-Asignacion.py')
+lexer_script = os.path.join(root_path, 'src', 'generatedModel.py')
+
+corpus = [
+    os.path.join(root_path, 'tests', 'Test_program.txt'),
+    os.path.join(root_path, 'src', 'Test_program.txt'),
+]
+
+# Backend variants as the command line flags of the parser script
+reference = 'rpn'
+variants = {
+    'rpn'   : [],
+    'rpn -O': ['-O'],
+    'tac'   : ['--tac'],
+    'tac -O': ['--tac', '-O'],
+}
+
+step_limit = 200000
+timing_repeats = 5
+timing_floor = 0.001  # seconds, differences below it are noise
+
+# --- Running the scripts ---
+
+def run_script(script, source_code, flags=()):
+    # The scripts read src/Test_program.txt from the working directory
+    # and write their output next to it, so run them inside a scratch folder
+    script_path = os.path.dirname(script)
+    working_path = os.getcwd()
+    arguments = sys.argv
+
+    with tempfile.TemporaryDirectory() as scratch_path:
+        os.makedirs(os.path.join(scratch_path, 'src'))
+        with open(os.path.join(scratch_path, 'src', 'Test_program.txt'), 'w') as source_file:
+            source_file.write(source_code)
+
+        try:
+            os.chdir(scratch_path)
+            sys.argv = [script] + list(flags)
+            if script_path not in sys.path:
+                # Lets the parser load its cached parsetab.py
+                sys.path.insert(0, script_path)
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                return runpy.run_path(script)
+        finally:
+            os.chdir(working_path)
+            sys.argv = arguments
+
+def scan(lexer, source_code):
+    # Token stream as (type, value), with UMINUS and the numbers normalized
+    # since the lexers disagree on how a negative number is represented
+    tokens = []
+    lexer.input(source_code)
+    while True:
+        token = lexer.token()
+        if not token:
+            break
+        if token.type == 'UMINUS':
+            token_type = 'DOUBLE' if isinstance(token.value, float) else 'INT'
+        else:
+            token_type = token.type
+        if token_type in ('INT', 'DOUBLE'):
+            tokens.append((token_type, float(token.value)))
+        else:
+            tokens.append((token_type, token.value))
+    return tokens
+
+# --- Pseudo-assembly interpreter ---
+
+operators = {
+    '+' : lambda left, right: left + right,
+    '-' : lambda left, right: left - right,
+    '*' : lambda left, right: left * right,
+    '/' : lambda left, right: divide(left, right),
+    '<' : lambda left, right: int(left < right),
+    '>' : lambda left, right: int(left > right),
+    '<=': lambda left, right: int(left <= right),
+    '>=': lambda left, right: int(left >= right),
+    '==': lambda left, right: int(left == right),
+    '|' : lambda left, right: int(bool(left) or bool(right)),
+    '&' : lambda left, right: int(bool(left) and bool(right)),
+}
+
+mnemonics = {
+    'ADD': '+', 'SUB': '-', 'MUL': '*', 'DIV': '/',
+    'LT' : '<', 'GT' : '>', 'LE' : '<=', 'GE': '>=', 'EQ': '==',
+    'OR' : '|', 'AND': '&',
+}
+
+def divide(left, right):
+    if isinstance(left, int) and isinstance(right, int):
+        # C integer division truncates towards zero
+        quotient = abs(left) // abs(right)
+        return quotient if (left < 0) == (right < 0) else -quotient
+    return left / right
+
+def load_program(lines):
+    # Split the pseudo-assembly into declarations, instructions and labels
+    declarations = []
+    program = []
+    labels = {}
+
+    for line in lines:
+        label = re.match(r'(L\d+):\s*(.*)', line)
+        if label:
+            labels[label.group(1)] = len(program)
+            line = label.group(2)
+        elif not line.startswith(' '):
+            declarations.append(line.split())
+            continue
+
+        line = line.strip()
+        if line == 'END' or line.endswith(' END'):
+            line = line[:-3].strip()
+        if line:
+            operation, _, operands = line.partition(' ')
+            program.append((operation, operands.strip()))
+
+    return declarations, program, labels
+
+def execute(lines):
+    declarations, program, labels = load_program(lines)
+
+    memory = {}
+    for _, variable in declarations:
+        array = re.fullmatch(r'(\w+)((\[\d+\])+)', variable)
+        if array:
+            sizes = [int(size) for size in re.findall(r'\d+', array.group(2))]
+            memory[array.group(1)] = zeros(sizes)
+        else:
+            memory[variable] = 0
+
+    def element(name, index):
+        array = memory[name]
+        index = int(index)
+        if not isinstance(array, list) or not 0 <= index < len(array):
+            raise IndexError(f'{name}[{index}] out of bounds')
+        return array, index
+
+    def locate(operand):
+        # x[i] or m[i] [j] (rpn) as the row holding the element and its index
+        name, subscripts = re.fullmatch(r'(\w+)((?:\s*\[[^\]]+\])+)', operand).groups()
+        indexes = [value(index) for index in re.findall(r'\[([^\]]+)\]', subscripts)]
+        array, index = element(name, indexes[0])
+        for next_index in indexes[1:]:
+            memory['$row'] = array[index]
+            array, index = element('$row', next_index)
+        return array, index
+
+    def value(operand):
+        if re.fullmatch(r'-?\d+', operand):
+            return int(operand)
+        if re.fullmatch(r'-?\d+\.\d*', operand):
+            return float(operand)
+        if '[' in operand:
+            array, index = locate(operand)
+            return array[index]
+        return memory[operand]
+
+    def assign(target, result):
+        if '[' in target:
+            array, index = locate(target)
+            array[index] = result
+        else:
+            memory[target] = result
+
+    def evaluate(expression):
+        # RPN: the operand on top of the stack is the left one (1 pos - is pos - 1)
+        stack = []
+        for token in re.findall(r'\S+(?:\s+\[[^\]]+\])*', expression):
+            if token == '!':
+                stack.append(int(not stack.pop()))
+            elif token in operators:
+                left = stack.pop()
+                right = stack.pop()
+                stack.append(operators[token](left, right))
+            else:
+                stack.append(value(token))
+        return stack.pop()
+
+    printed = []
+    stack = []
+    steps = 0
+    position = 0
+    outcome = 'ok'
+
+    try:
+        while position < len(program):
+            steps += 1
+            if steps > step_limit:
+                outcome = 'step limit'
+                break
+
+            operation, operands = program[position]
+            arguments = operands.split(', ')
+            position += 1
+
+            if operation == 'EVAL':
+                stack.append(evaluate(operands))
+            elif operation == 'ASS':
+                assign(operands, stack.pop())
+            elif operation == 'GOTO':
+                position = labels[operands]
+            elif operation == 'GOTOF' and len(arguments) == 1:
+                if not stack.pop():
+                    position = labels[operands]
+            elif operation == 'GOTOF':
+                if not value(arguments[0]):
+                    position = labels[arguments[1]]
+            elif operation == 'PRINT':
+                printed.append(evaluate(operands))
+            elif operation == 'INC':
+                assign(operands, value(operands) + 1)
+            elif operation == 'DEC':
+                assign(operands, value(operands) - 1)
+            elif operation == 'MOV':
+                assign(arguments[0], value(arguments[1]))
+            elif operation == 'LOAD':
+                array, index = element(arguments[1], value(arguments[2]))
+                memory[arguments[0]] = array[index]
+            elif operation == 'STORE':
+                array, index = element(arguments[0], value(arguments[1]))
+                array[index] = value(arguments[2])
+            elif operation == 'NOT':
+                memory[arguments[0]] = int(not value(arguments[1]))
+            elif operation in mnemonics:
+                left, right = value(arguments[1]), value(arguments[2])
+                memory[arguments[0]] = operators[mnemonics[operation]](left, right)
+            else:
+                raise ValueError(f'unknown instruction {operation}')
+    except (ArithmeticError, IndexError, KeyError, ValueError) as error:
+        outcome = f'{type(error).__name__}: {error}'
+
+    variables = {name: memory[name] for name in memory if not name.startswith('$')}
+    return (outcome, printed, variables), steps
+
+def zeros(sizes):
+    if len(sizes) == 1:
+        return [0] * sizes[0]
+    return [zeros(sizes[1:]) for _ in range(sizes[0])]
+
+def expected_increments(lines):
+    # Independent rewrite of EVAL/ASS pairs that -O turns into INC/DEC
+    expected = []
+    for line in lines:
+        target = re.fullmatch(r'\s+ASS\s+(\w+)', line)
+        evaluation = re.fullmatch(r'\s+EVAL (\S+) (\S+) ([+-])', expected[-1]) if expected else None
+
+        step = None
+        if target and evaluation:
+            right, left, operator = evaluation.groups()
+            name = target.group(1)
+            if operator == '+' and sorted([left, right]) == sorted([name, '1']):
+                step = 'INC'
+            elif operator == '+' and sorted([left, right]) == sorted([name, '-1']):
+                step = 'DEC'
+            elif operator == '-' and left == name and right in ('1', '-1'):
+                step = 'DEC' if right == '1' else 'INC'
+
+        if step:
+            expected[-1] = f'    {step:<4} {name}'
+        else:
+            expected.append(line)
+    return expected
+
+# --- Lexer divergences ---
+#
+# Literals that generatedModel.py and Lexical-Asignacion.py scan
+# differently, as kind: (literal generator, tokens expected from
+# generatedModel.py, tokens expected from Lexical-Asignacion.py)
+
+def scientific_literal(rng):
+    return f'{rng.randint(0, 9)}.{rng.randint(0, 99)}e{rng.choice(["", "-"])}{rng.randint(1, 9)}'
+
+def scientific_asignacion(literal):
+    # No exponent: 1.5e-3 is DOUBLE 1.5, ID e, UMINUS -3 and 1.5e3 is DOUBLE 1.5, ID e3
+    mantissa, exponent = literal.split('e')
+    if exponent.startswith('-'):
+        return [('DOUBLE', float(mantissa)), ('ID', 'e'), ('INT', float(exponent))]
+    return [('DOUBLE', float(mantissa)), ('ID', 'e' + exponent)]
+
+def leading_zeros_model(literal):
+    # INT is -?[1-9]\d*|0, so each leading zero is an INT of its own
+    digits = literal.lstrip('0')
+    return [('INT', 0.0)] * (len(literal) - len(digits)) + [('INT', float(digits))]
+
+lexer_divergences = {
+    'scientific notation': (
+        scientific_literal,
+        lambda literal: [('DOUBLE', float(literal))],
+        scientific_asignacion,
+    ),
+    'leading zeros': (
+        lambda rng: '0' * rng.randint(1, 2) + str(rng.randint(1, 99)),
+        leading_zeros_model,
+        lambda literal: [('INT', float(literal))],
+    ),
+    'negative zero': (
+        lambda rng: '-0',
+        lambda literal: [('MINUS', '-'), ('INT', 0.0)],
+        lambda literal: [('INT', 0.0)],
+    ),
+    'trailing dot': (
+        # generatedModel.py skips the '.' as an illegal character
+        lambda rng: f'{rng.randint(0, 99)}.',
+        lambda literal: [('INT', float(literal[:-1]))],
+        lambda literal: [('DOUBLE', float(literal))],
+    ),
+}
+
+# Words both lexers scan the same way
+common_words = [
+    'a', 'x1', 'while', 'print', 'int', 'double', '(', ')', '{', '}', '[', ']',
+    '=', '<', '>', '<=', '>=', '+', '-', '*', '/', ',', ';', '!', '&', '|',
+    '0', '12', '3.25', '-4', '-1.5',
+]
+
+# Each distinct expected divergence seen, as (kind, literal): (model tokens, asignacion tokens)
+divergences_seen = {}
+lexers = {}
+
+def generate_words(rng):
+    # Token sequence as [(kind, word)], kind is None for the common words
+    words = []
+    for _ in range(rng.randint(1, 12)):
+        if rng.random() < 0.3:
+            kind = rng.choice(sorted(lexer_divergences))
+            words.append((kind, lexer_divergences[kind][0](rng)))
+        else:
+            words.append((None, rng.choice(common_words)))
+    return words
+
+def check_lexers(words):
+    if not lexers:
+        # Any valid program builds the lexers
+        program = 'int a;\nprint a;\n'
+        lexers['model'] = run_script(lexer_script, program)['lexer']
+        lexers['asignacion'] = run_script(parser_script, program)['lexer']
+
+    expected_model = []
+    expected_asignacion = []
+    for kind, word in words:
+        if kind is None:
+            tokens = scan(lexers['asignacion'], word)
+            expected_model += tokens
+            expected_asignacion += tokens
+            continue
+        _, model, asignacion = lexer_divergences[kind]
+        expected_model += model(word)
+        expected_asignacion += asignacion(word)
+        divergences_seen[(kind, word)] = (model(word), asignacion(word))
+
+    text = ' '.join(word for _, word in words)
+    with redirect_stdout(io.StringIO()):
+        scanned_model = scan(lexers['model'], text)
+    scanned_asignacion = scan(lexers['asignacion'], text)
+
+    failures = []
+    if scanned_model != expected_model:
+        failures.append(f'generatedModel.py on {text!r}: scanned {scanned_model}, expected {expected_model}')
+    if scanned_asignacion != expected_asignacion:
+        failures.append(f'Lexical-Asignacion.py on {text!r}: scanned {scanned_asignacion}, expected {expected_asignacion}')
+    return failures
+
+def report_divergences():
+    print('--------------Expected lexer divergences----------------')
+    for (kind, literal), (model, asignacion) in sorted(divergences_seen.items()):
+        print(f'    {kind:<20} {literal!r:<10} generatedModel {model}  Lexical-Asignacion {asignacion}')
+    print(f'{len(divergences_seen)} expected lexer divergence(s)')
+
+# --- Grammar fuzzer ---
+#
+# Programs stay inside the language both lexers agree on: no scientific
+# notation, no leading zeros and no -0, which check_lexers covers instead
+# since the parser does not accept all of them. Loops are counted by dedicated counters that only
+# range over 0..4, so they always terminate and index x[], y[] and m[][]
+# safely. Some loops never run (a limit of 0 or a reversed comparison),
+# which catches optimizations that pay off only when the body runs. Other loops count in an element of z[] or g[][] (cells), read
+# by their condition and written by their body; nothing else writes z or g.
+
+integer_names = ['a', 'b', 'n']
+double_names = ['s', 'd']
+counter_names = ['i', 'j', 'k']
+array_names = ['x', 'y']
+array_size = 5
+matrix_names = ['m']
+cell_names = ['z[0]', 'z[2]', 'g[0][1]', 'g[1][1]', 'g[2][0]']
+cell_size = 3
+
+# Programs that once broke a backend, checked before the random ones
+regressions = [
+    # -O hoisted the loads of m[1][1] out of the loop although the body stores into m
+    'int m[3][3];\nint s;\nm[1][1] = 0;\n'
+    'while (m[1][1] < 3) {\nm[1][1] = m[1][1] + 1;\ns = s + 1;\n}\nprint s;\n',
+    # -O hoisted c * c + 1 out of a loop body that never runs
+    'int n, a, b, c;\nc = 3;\nwhile (n < 100) {\nif (n > 50) {\nb = 1;\n}\na = 0;\n'
+    'while (a > 5) {\nb = c * c + 1;\na = a - 1;\n}\nn = n + 1;\n}\nprint b;\n',
+]
+
+def generate_program(rng):
+    lines = [
+        'int ' + ', '.join(integer_names) + ';',
+        'double ' + ', '.join(double_names) + ';',
+        'int ' + ', '.join(counter_names) + ';',
+        f'double x[{array_size}];',
+        f'int y[{array_size}];',
+        f'double m[{array_size}][{array_size}];',
+        f'int z[{cell_size}];',
+        f'int g[{cell_size}][{cell_size}];',
+        '',
+        '// generated program',
+    ]
+    for _ in range(rng.randint(1, 6)):
+        lines += generate_statement(rng, [], 3)
+    for name in integer_names + double_names:
+        lines.append(f'print {name};')
+    return '\n'.join(lines) + '\n'
+
+def generate_statement(rng, active_counters, depth):
+    kind = rng.choice(['assignment', 'assignment', 'print', 'if', 'while', 'block'])
+    if depth == 0:
+        kind = rng.choice(['assignment', 'print'])
+
+    if kind == 'assignment':
+        return [f'{generate_target(rng, active_counters)} = {generate_expression(rng, active_counters, 3)};']
+    if kind == 'print':
+        return [f'print {generate_expression(rng, active_counters, 2)};']
+    if kind == 'if':
+        lines = [f'if ({generate_condition(rng, active_counters)}) {{']
+        lines += generate_body(rng, active_counters, depth - 1)
+        if rng.random() < 0.5:
+            lines += ['} else {'] + generate_body(rng, active_counters, depth - 1)
+        return lines + ['}']
+    if kind == 'block':
+        return ['{'] + generate_body(rng, active_counters, depth - 1) + ['}']
+
+    free_counters = [name for name in counter_names + cell_names if name not in active_counters]
+    if not free_counters:
+        return [f'print {generate_expression(rng, active_counters, 2)};']
+    counter = rng.choice(free_counters)
+    limit = rng.randint(0, array_size - 1)
+    body = generate_body(rng, active_counters + [counter], depth - 1)
+
+    if rng.random() < 0.2:
+        # Reversed comparison, the loop is never entered
+        step = f'{counter} = {counter} + 1;'
+        return [f'{counter} = 0;', f'while ({limit} < {counter}) {{'] + body + [step, '}']
+    if counter in cell_names:
+        return [f'{counter} = 0;', f'while ({counter} < {limit}) {{'] + body + [f'{counter} = {counter} + 1;', '}']
+
+    if rng.random() < 0.5:
+        step = rng.choice([f'{counter} = {counter} + 1;', f'{counter} = 1 + {counter};'])
+        return [f'{counter} = 0;', f'while ({counter} < {limit}) {{'] + body + [step, '}']
+    step = rng.choice([f'{counter} = {counter} - 1;', f'{counter} = {counter}-1;', f'{counter} = {counter} + -1;'])
+    return [f'{counter} = {limit};', f'while ({counter} > 0) {{'] + body + [step, '}']
+
+def generate_body(rng, active_counters, depth):
+    lines = []
+    for _ in range(rng.randint(1, 3)):
+        lines += generate_statement(rng, active_counters, depth)
+    return lines
+
+def generate_target(rng, active_counters):
+    kind = rng.choice(['name', 'name', 'name', 'element', 'matrix'])
+    if kind == 'element':
+        return f'{rng.choice(array_names)}[{generate_index(rng, active_counters)}]'
+    if kind == 'matrix':
+        return generate_matrix_element(rng, active_counters)
+    return rng.choice(integer_names + double_names)
+
+def generate_matrix_element(rng, active_counters):
+    row = generate_index(rng, active_counters)
+    column = generate_index(rng, active_counters)
+    return f'{rng.choice(matrix_names)}[{row}][{column}]'
+
+def generate_index(rng, active_counters):
+    return rng.choice([str(rng.randrange(array_size))] + counter_names)
+
+def generate_operand(rng, active_counters):
+    kind = rng.choice(['integer', 'double', 'name', 'name', 'element', 'matrix', 'cell'])
+    if kind == 'integer':
+        return str(rng.choice([rng.randint(0, 9), rng.randint(-9, -1)]))
+    if kind == 'double':
+        return f'{rng.choice(["", "-"])}{rng.randint(0, 9)}.{rng.randint(0, 99)}'
+    if kind == 'element':
+        return f'{rng.choice(array_names)}[{generate_index(rng, active_counters)}]'
+    if kind == 'matrix':
+        return generate_matrix_element(rng, active_counters)
+    if kind == 'cell':
+        return rng.choice(cell_names)
+    return rng.choice(integer_names + double_names + counter_names)
+
+def generate_expression(rng, active_counters, depth):
+    if depth == 0 or rng.random() < 0.3:
+        return generate_operand(rng, active_counters)
+    kind = rng.choice(['arithmetic', 'arithmetic', 'divide', 'condition', 'negate', 'parenthesis'])
+    if kind == 'arithmetic':
+        left = generate_expression(rng, active_counters, depth - 1)
+        right = generate_expression(rng, active_counters, depth - 1)
+        return f'{left} {rng.choice(["+", "-", "*"])} {right}'
+    if kind == 'divide':
+        return f'({generate_expression(rng, active_counters, depth - 1)}) / {rng.choice(["2", "3", "4.0"])}'
+    if kind == 'condition':
+        return f'({generate_condition(rng, active_counters)})'
+    if kind == 'negate':
+        return rng.choice([
+            f'-({generate_expression(rng, active_counters, depth - 1)})',
+            f'-{rng.choice(integer_names + double_names + counter_names)}',
+        ])
+    return f'({generate_expression(rng, active_counters, depth - 1)})'
+
+def generate_condition(rng, active_counters):
+    left = generate_expression(rng, active_counters, 1)
+    right = generate_expression(rng, active_counters, 1)
+    kind = rng.choice(['compare', 'compare', 'not', 'logic'])
+    if kind == 'not':
+        return f'!({left} {rng.choice(["<", ">"])} {right})'
+    if kind == 'logic':
+        return f'({left} < {right}) {rng.choice(["&", "|"])} ({left} == {right})'
+    return f'{left} {rng.choice(["<", ">", "<=", ">=", "=="])} {right}'
+
+# --- Differential checks ---
+
+timings = {name: {'compile': 0.0, 'execute': 0.0, 'steps': 0} for name in variants}
+
+# Execution time of each backend per case, as (case, {backend: seconds})
+case_timings = []
+
+def check_case(case, source_code):
+    failures = []
+    outputs = {}
+    results = {}
+    steps = {}
+    executions = {}
+
+    for name, flags in variants.items():
+        start = time.perf_counter()
+        namespace = run_script(parser_script, source_code, flags)
+        compiled = time.perf_counter()
+        outputs[name] = '\n'.join(namespace['assembly_code']).split('\n')
+
+        # Best of a few runs, so a single slow run does not flag the case
+        executions[name] = None
+        for _ in range(timing_repeats):
+            executing = time.perf_counter()
+            results[name], steps[name] = execute(outputs[name])
+            execution = time.perf_counter() - executing
+            if executions[name] is None or execution < executions[name]:
+                executions[name] = execution
+
+        timings[name]['compile'] += compiled - start
+        timings[name]['execute'] += executions[name]
+        timings[name]['steps'] += steps[name]
+
+        if name == reference:
+            reference_tokens = scan(namespace['lexer'], source_code)
+
+    lexer_tokens = scan(run_script(lexer_script, source_code)['lexer'], source_code)
+    if lexer_tokens != reference_tokens:
+        for index, (expected, actual) in enumerate(zip(reference_tokens, lexer_tokens + [None] * len(reference_tokens))):
+            if expected != actual:
+                failures.append(f'token stream: token {index} is {actual}, expected {expected}')
+                break
+        else:
+            failures.append(f'token stream: {len(lexer_tokens)} tokens, expected {len(reference_tokens)}')
+
+    if outputs['rpn -O'] != expected_increments(outputs[reference]):
+        failures.append('rpn -O: pseudo-assembly differs from rpn besides INC/DEC')
+
+    for name in variants:
+        # Each -O backend against its plain version, tac against rpn
+        expected = name.replace(' -O', '') if name.endswith(' -O') else reference
+        if results[name] != results[expected]:
+            failures.append(f'{name}: executed {results[name]}, expected {results[expected]} from {expected}')
+
+    for name in variants:
+        plain = name.replace(' -O', '')
+        if steps[name] > steps[plain]:
+            failures.append(f'{name}: slow path, {steps[name]} instructions executed against {steps[plain]} for {plain}')
+
+    case_timings.append((case, executions))
+    return failures
+
+def report_timings(tolerance, slowest):
+    print('--------------Timings----------------')
+    for name, timing in timings.items():
+        print(f"{name:<7} compile {timing['compile'] * 1000:9.1f} ms  "
+              f"execute {timing['execute'] * 1000:9.1f} ms  "
+              f"{timing['steps']:>9} instructions")
+
+    print(f'--------------Slowest {slowest} case(s)----------------')
+    ranking = sorted(case_timings, key=lambda item: max(item[1].values()), reverse=True)
+    for case, executions in ranking[:slowest]:
+        print(f'{case:<20}', '  '.join(f'{name} {seconds * 1000:7.2f} ms' for name, seconds in executions.items()))
+
+    slower = []
+    for case, executions in case_timings:
+        for name in variants:
+            plain = name.replace(' -O', '')
+            slowdown = executions[name] - executions[plain]
+            if slowdown > executions[plain] * tolerance and slowdown > timing_floor:
+                slower.append(
+                    f'{case}: {name} {executions[name] * 1000:.2f} ms against '
+                    f'{plain} {executions[plain] * 1000:.2f} ms'
+                )
+
+    print(f'--------------Slower than plain by over {tolerance:.0%}----------------')
+    for regression in slower:
+        print('   ', regression)
+    print(f'{len(slower)} timing regression(s)')
+
+def report(case, source_code, failures):
+    print(f'--------------{case} failed----------------')
+    print(source_code)
+    for failure in failures:
+        print('   ', failure)
+
+def main():
+    arguments = argparse.ArgumentParser()
+    arguments.add_argument('--cases', type=int, default=100, help='number of random programs')
+    arguments.add_argument('--seed', type=int, default=0, help='seed of the random programs')
+    arguments.add_argument('--no-hypothesis', action='store_true', help='do not use hypothesis')
+    arguments.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown of -O over plain')
+    arguments.add_argument('--slowest', type=int, default=5, help='number of slowest cases listed')
+    options = arguments.parse_args()
+
+    failed = 0
+    for program_path in corpus:
+        with open(program_path, 'r') as source_file:
+            source_code = source_file.read()
+        case = os.path.relpath(program_path, root_path)
+        failures = check_case(case, source_code)
+        if failures:
+            failed += 1
+            report(case, source_code, failures)
+
+    for number, source_code in enumerate(regressions):
+        failures = check_case(f'regression {number}', source_code)
+        if failures:
+            failed += 1
+            report(f'regression {number}', source_code, failures)
+
+    if given is not None and not options.no_hypothesis:
+        failing = []
+
+        @seed(options.seed)
+        @settings(max_examples=options.cases, deadline=None, database=None)
+        @given(st.randoms(use_true_random=False))
+        def fuzz(rng):
+            source_code = generate_program(rng)
+            failures = check_case(f'example {len(case_timings)}', source_code)
+            failures += check_lexers(generate_words(rng))
+            if failures:
+                failing.append((source_code, failures))
+            assert not failures
+
+        try:
+            fuzz()
+        except (AssertionError, BaseExceptionGroup) as error:
+            # Hypothesis runs the shrunk example of each distinct failure last
+            minimal = len(error.exceptions) if isinstance(error, BaseExceptionGroup) else 1
+            for source_code, failures in failing[-minimal:]:
+                failed += 1
+                report('shrunk generated program', source_code, failures)
+    else:
+        for case in range(options.cases):
+            rng = random.Random(options.seed + case)
+            source_code = generate_program(rng)
+            failures = check_case(f'seed {options.seed + case}', source_code)
+            failures += check_lexers(generate_words(rng))
+            if failures:
+                failed += 1
+                report(f'seed {options.seed + case}', source_code, failures)
+
+    report_divergences()
+    report_timings(options.tolerance, options.slowest)
+    print(f'{failed} failing case(s)')
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())